@@ -1,3 +1,8 @@
+import asyncio
+import argparse
+import base64
+import hashlib
+import struct
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import PyPDF2
@@ -9,6 +14,11 @@ import io # For handling image bytes
 import json
 import os
 import platform
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
 
 # --- Constants ---
 SETTINGS_FILE = os.path.join(os.path.expanduser("~"), ".rsvp_reader_settings.json")
@@ -16,6 +26,121 @@ DEFAULT_FONT_FAMILY = "Helvetica"
 BASE_RSVP_FONT_SIZE = 36 # Base size for RSVP display
 PUNCTUATION_PAUSE_MULTIPLIER = 1.3 # Extra delay for punctuation
 THUMBNAIL_RESIZE_DEBOUNCE_MS = 250 # Delay for debouncing thumbnail resize
+SERVER_DEFAULT_HOST = "127.0.0.1" # Headless server only listens locally unless told otherwise
+SERVER_DEFAULT_PORT = 8765
+STREAM_WORDS_PER_MESSAGE = 500 # Max words per WebSocket message when streaming pages
+MAX_RANGE_WORDS = 5000 # Max words returned by a single range request
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_CLIENT_FRAME_BYTES = 125 # Clients only send control frames, whose payload is at most 125 bytes
+MAX_CACHED_DOCUMENTS = 8 # Least recently used documents are dropped from the server's memory beyond this
+SERVER_LOCAL_HOST_NAMES = ("localhost", "127.0.0.1", "[::1]") # Host header names always accepted
+SERVER_DEFAULT_ALLOWED_ORIGINS = ("http://localhost:5173", "http://127.0.0.1:5173") # Vite dev server
+SENTENCE_END_CHARS = ('.', '!', '?') # A chunk never extends past a word ending in one of these
+CLOSING_PUNCTUATION = '"\')]}\u201d\u2019' # Stripped before checking for a sentence end
+FUNCTION_WORDS = frozenset((
+    'a', 'an', 'the', # Articles
+    'of', 'to', 'in', 'on', 'at', 'by', 'for', 'with', 'from', 'into', 'onto', 'about', 'over', 'under', # Prepositions
+    'and', 'or', 'but', 'nor', 'as', 'than', 'if', # Conjunctions
+)) # Short words kept together with the word that follows them
+
+
+def ends_sentence(word):
+    """True if a word ends a sentence, ignoring closing quotes and brackets (e.g. 'end.)')."""
+    return word.rstrip(CLOSING_PUNCTUATION).endswith(SENTENCE_END_CHARS)
+
+
+def iter_pdf_page_words(pdf_path, warn=None):
+    """
+    Yields the words of each page of a PDF in page order, using PyPDF2 text
+    extraction. Pages without extractable text yield an empty list.
+    """
+    with open(pdf_path, 'rb') as pypdf2_file:
+        reader = PyPDF2.PdfReader(pypdf2_file)
+        if reader.is_encrypted:
+            try: reader.decrypt('')
+            except Exception:
+                if warn: warn("Could not decrypt PDF for text. Thumbnails may work.")
+        for page in reader.pages:
+            extracted_page_text = page.extract_text()
+            yield extracted_page_text.split() if extracted_page_text else []
+
+
+class ChunkPlan:
+    """
+    Phrase-aware chunk boundaries for a word list at a given maximum chunk size.
+    Built once per document and chunk size so that stepping forwards, stepping
+    backwards, seeking and progress are all constant-time lookups.
+    """
+    def __init__(self, words, max_chunk_size, hard_breaks=()):
+        self.max_chunk_size = max(1, max_chunk_size)
+        self.word_count = len(words)
+        self.chunk_starts = array('I') # Start index of each chunk, plus a trailing sentinel
+        self.word_to_chunk = array('I', [0]) * self.word_count
+        self._build(words, hard_breaks)
+
+    @staticmethod
+    def _is_function_word(word):
+        return word.lower() in FUNCTION_WORDS
+
+    def _build(self, words, hard_breaks):
+        breaks = sorted(set(b for b in hard_breaks if 0 < b < self.word_count))
+        break_pos = 0
+        start = 0
+        while start < self.word_count:
+            while break_pos < len(breaks) and breaks[break_pos] <= start: break_pos += 1
+            next_break = breaks[break_pos] if break_pos < len(breaks) else self.word_count # e.g. page starts
+            limit = min(next_break, start + self.max_chunk_size)
+            end = limit
+            for i in range(start, limit):
+                if ends_sentence(words[i]):
+                    end = i + 1; break
+            # Don't leave function words dangling at the end of a full chunk; push them to the next
+            # one so it starts with its phrase, unless the whole window is function words
+            if end == limit and end < next_break:
+                content_end = end
+                while content_end > start and self._is_function_word(words[content_end - 1]): content_end -= 1
+                if content_end > start: end = content_end
+            chunk_index = len(self.chunk_starts)
+            self.chunk_starts.append(start)
+            for i in range(start, end): self.word_to_chunk[i] = chunk_index
+            start = end
+        self.chunk_starts.append(self.word_count)
+
+    @property
+    def chunk_count(self):
+        return len(self.chunk_starts) - 1
+
+    def chunk_index_for(self, word_index):
+        """Index of the chunk containing word_index (chunk_count once past the end)."""
+        if word_index >= self.word_count: return self.chunk_count
+        return self.word_to_chunk[max(0, word_index)]
+
+    def chunk_bounds(self, chunk_index):
+        """(start, end) word indices of a chunk, end exclusive."""
+        return self.chunk_starts[chunk_index], self.chunk_starts[chunk_index + 1]
+
+    def chunk_start_for(self, word_index):
+        chunk_index = self.chunk_index_for(word_index)
+        if chunk_index >= self.chunk_count: return self.word_count
+        return self.chunk_starts[chunk_index]
+
+    def next_start(self, word_index):
+        chunk_index = self.chunk_index_for(word_index)
+        if chunk_index >= self.chunk_count: return self.word_count
+        return self.chunk_starts[chunk_index + 1]
+
+    def previous_start(self, word_index):
+        """Start of the previous chunk, or of the current one when word_index is mid-chunk."""
+        chunk_index = self.chunk_index_for(word_index)
+        if chunk_index < self.chunk_count and self.chunk_starts[chunk_index] < word_index:
+            return self.chunk_starts[chunk_index]
+        return self.chunk_starts[max(0, chunk_index - 1)]
+
+    def progress(self, word_index):
+        """Percentage of words read once the chunk containing word_index has been shown."""
+        if self.word_count == 0: return 0
+        return (self.next_start(word_index) / self.word_count) * 100
+
 
 class RSVPApp:
     """
@@ -34,6 +159,10 @@ class RSVPApp:
         self.words = []
         self.page_word_indices = [] 
         self.current_word_index = 0 
+        self.chunk_plan = None # ChunkPlan for the current words and chunk size
+        self._chunk_plan_cache = {} # chunk size -> ChunkPlan for the current document
+        self._chunk_plans_building = set() # Chunk sizes with a build thread running for the current document
+        self._chunk_plan_generation = 0 # Bumped on every document change to discard stale builds
         
         self.is_running = False
         self.is_paused = False
@@ -77,6 +206,7 @@ class RSVPApp:
 
         self.wpm_entry_var.set(str(self.wpm_var.get()))
         self.wpm_var.trace_add("write", self._update_wpm_entry_from_var)
+        self.words_per_step_var.trace_add("write", self._on_chunk_size_var_write) # Arrows and typed values
 
 
     def _build_ui(self):
@@ -348,6 +478,64 @@ class RSVPApp:
         
         self.save_settings()
 
+    # --- Chunk Plan ---
+    def _on_chunk_size_var_write(self, *args):
+        try: self._request_chunk_plan() # Previous plan keeps serving until the new one is installed
+        except tk.TclError: pass # Spinbox text mid-edit, not a number yet
+
+    def _current_chunk_size(self):
+        try: chunk_size = self.words_per_step_var.get()
+        except tk.TclError: # Spinbox text mid-edit; keep the size in use
+            return self.chunk_plan.max_chunk_size if self.chunk_plan else 1
+        return chunk_size if chunk_size > 0 else 1
+
+    def _invalidate_chunk_plans(self):
+        self._chunk_plan_generation += 1
+        self._chunk_plan_cache = {}
+        self._chunk_plans_building = set()
+        self.chunk_plan = None
+
+    def _active_chunk_plan(self):
+        """The installed plan if it matches the current words and chunk size; otherwise None (fixed window)."""
+        plan = self.chunk_plan
+        if plan and plan.word_count == len(self.words) and plan.max_chunk_size == self._current_chunk_size():
+            return plan
+        return None
+
+    def _request_chunk_plan(self, background=True):
+        """
+        Installs the plan for the current chunk size, building it on a worker thread if needed.
+        Each uncached size is a full single pass over the document; the old plan keeps serving
+        until the new one is installed, and every plan built is cached for the document.
+        """
+        chunk_size = self._current_chunk_size()
+        generation = self._chunk_plan_generation
+        cached_plan = self._chunk_plan_cache.get(chunk_size)
+        if cached_plan: self._install_chunk_plan(cached_plan, generation); return
+        if not self.words: return
+        if not background:
+            self._install_chunk_plan(ChunkPlan(self.words, chunk_size, self.page_word_indices), generation)
+            return
+        if chunk_size in self._chunk_plans_building: return # Installed when that build finishes
+        self._chunk_plans_building.add(chunk_size)
+        threading.Thread(target=self._chunk_plan_worker,
+                         args=(self.words, self.page_word_indices, chunk_size, generation), daemon=True).start()
+
+    def _chunk_plan_worker(self, words, page_word_indices, chunk_size, generation):
+        plan = ChunkPlan(words, chunk_size, page_word_indices)
+        self.master.after(0, self._install_chunk_plan, plan, generation)
+
+    def _install_chunk_plan(self, plan, generation):
+        if generation != self._chunk_plan_generation: return # Built for a document that is gone
+        self._chunk_plans_building.discard(plan.max_chunk_size)
+        self._chunk_plan_cache[plan.max_chunk_size] = plan
+        if plan.max_chunk_size != self._current_chunk_size(): return # Setting changed again meanwhile
+        self.chunk_plan = plan
+        if self.words and (not self.is_running or self.is_paused):
+            self.current_word_index = plan.chunk_start_for(self.current_word_index)
+            self.master.after(0, self._display_current_chunk)
+            self._update_button_states()
+
     def update_thumbnail(self, page_number_to_display):
         self.current_thumbnail_page_num.set(page_number_to_display) 
         self.thumbnail_page_label.config(text=f"Preview: Page {page_number_to_display}")
@@ -411,6 +599,7 @@ class RSVPApp:
             except Exception as e: messagebox.showerror("PDF Error", f"Could not open PDF: {e}"); self._clear_pdf_data(); return
             
             num_pages_loaded = self.load_text_from_pdf()
+            self._request_chunk_plan(background=False)
             if num_pages_loaded > 0:
                 self.status_bar.config(text=f"PDF Loaded: {len(self.words)} words, {num_pages_loaded} pages. Ready.")
                 self.start_page_spinbox.config(from_=1, to=max(1, num_pages_loaded), state=tk.NORMAL)
@@ -429,6 +618,7 @@ class RSVPApp:
 
     def _clear_pdf_data(self):
         self.words = []; self.page_word_indices = []; self.current_word_index = 0
+        self._invalidate_chunk_plans()
         self.start_page_spinbox.config(from_=1, to=1, state=tk.DISABLED)
         self.start_page_var.set(1)
         self.current_thumbnail_page_num.set(0)
@@ -446,23 +636,14 @@ class RSVPApp:
     def load_text_from_pdf(self):
         if not self.pdf_path: return 0
         self.words = []; self.page_word_indices = []; self.current_word_index = 0
+        self._invalidate_chunk_plans()
         num_pages_pypdf2 = 0
         try:
-            with open(self.pdf_path, 'rb') as pypdf2_file:
-                reader = PyPDF2.PdfReader(pypdf2_file)
-                num_pages_pypdf2 = len(reader.pages)
-                if reader.is_encrypted:
-                    try: reader.decrypt('')
-                    except Exception: messagebox.showwarning("PDF Warning", "Could not decrypt PDF for text. Thumbnails may work.")
-                current_total_words = 0
-                for page_num in range(num_pages_pypdf2):
-                    self.page_word_indices.append(current_total_words)
-                    page = reader.pages[page_num]
-                    extracted_page_text = page.extract_text()
-                    if extracted_page_text:
-                        page_words = extracted_page_text.split()
-                        self.words.extend(page_words)
-                        current_total_words += len(page_words)
+            warn = lambda message: messagebox.showwarning("PDF Warning", message)
+            for page_words in iter_pdf_page_words(self.pdf_path, warn=warn):
+                self.page_word_indices.append(len(self.words))
+                self.words.extend(page_words)
+                num_pages_pypdf2 += 1
             
             if not self.words and num_pages_pypdf2 > 0 and self.pdf_document:
                  self.status_bar.config(text=f"PDF has {self.pdf_document.page_count} pages, but text extraction was poor.")
@@ -485,7 +666,7 @@ class RSVPApp:
             actual_delay = base_delay_per_chunk
             if num_words_in_chunk > 0:
                 last_word_in_chunk = chunk_to_display[-1]
-                if last_word_in_chunk and last_word_in_chunk[-1] in ['.','!','?']:
+                if last_word_in_chunk and ends_sentence(last_word_in_chunk):
                     actual_delay *= PUNCTUATION_PAUSE_MULTIPLIER
             time.sleep(max(0.05, actual_delay))
             if self.is_running and not self.is_paused :
@@ -501,10 +682,12 @@ class RSVPApp:
     def _get_current_chunk_data(self):
         if not self.words or not (0 <= self.current_word_index < len(self.words)):
             return [], 0
-        chunk_size = self.words_per_step_var.get()
-        if chunk_size <= 0: chunk_size = 1
         start_idx = self.current_word_index
-        end_idx = min(len(self.words), start_idx + chunk_size)
+        plan = self._active_chunk_plan()
+        if plan:
+            _, end_idx = plan.chunk_bounds(plan.chunk_index_for(start_idx))
+        else: # Plan not built yet; fall back to a fixed window
+            end_idx = min(len(self.words), start_idx + self._current_chunk_size())
         actual_chunk_words = self.words[start_idx:end_idx]
         num_words_in_chunk = len(actual_chunk_words)
         return actual_chunk_words, num_words_in_chunk
@@ -512,10 +695,7 @@ class RSVPApp:
     def _display_current_chunk(self):
         current_reading_page = 1
         if self.words and self.page_word_indices:
-            for i, page_start_idx in enumerate(self.page_word_indices):
-                if self.current_word_index >= page_start_idx:
-                    current_reading_page = i + 1
-                else: break
+            current_reading_page = max(1, bisect_right(self.page_word_indices, self.current_word_index))
         self.reading_page_label.config(text=f"Reading: Page {current_reading_page if self.words else '-'}")
 
         if self.pdf_document and current_reading_page != self.current_thumbnail_page_num.get():
@@ -536,7 +716,9 @@ class RSVPApp:
             end_display_idx = self.current_word_index + num_words_in_chunk
             status_text = f"Words {start_display_idx}-{end_display_idx}/{len(self.words)}"
             self.status_bar.config(text=status_text)
-            self.progress_bar['value'] = (end_display_idx / len(self.words)) * 100 if len(self.words) > 0 else 0
+            plan = self._active_chunk_plan()
+            if plan: self.progress_bar['value'] = plan.progress(self.current_word_index)
+            else: self.progress_bar['value'] = (end_display_idx / len(self.words)) * 100 if len(self.words) > 0 else 0
         elif self.current_word_index >= len(self.words) and len(self.words) > 0:
             self.word_display.config(text="Done!")
             self.status_bar.config(text=f"Finished. (Word {len(self.words)}/{len(self.words)})")
@@ -610,9 +792,9 @@ class RSVPApp:
 
     def previous_chunk(self):
         if self.is_paused and self.words:
-            chunk_size = self.words_per_step_var.get()
-            if chunk_size <= 0: chunk_size = 1
-            self.current_word_index = max(0, self.current_word_index - chunk_size)
+            plan = self._active_chunk_plan()
+            if plan: self.current_word_index = plan.previous_start(self.current_word_index)
+            else: self.current_word_index = max(0, self.current_word_index - self._current_chunk_size())
             self.master.after(0, self._display_current_chunk)
             self._update_button_states()
 
@@ -676,8 +858,396 @@ class RSVPApp:
         if self.pdf_document: self.pdf_document.close()
         self.master.destroy()
 
+
+# --- Headless Streaming Server ---
+class SharedDocument:
+    """
+    Words and page offsets of one PDF, filled in page by page by a background
+    extraction and shared by every client session that opens the same file.
+    """
+    def __init__(self, doc_id, pdf_path, mtime):
+        self.doc_id = doc_id
+        self.pdf_path = pdf_path
+        self.mtime = mtime
+        self.words = []
+        self.page_word_indices = []
+        self.warnings = []
+        self.complete = False
+        self.error = None
+        self._changed = asyncio.Event() # Replaced after every change so waiters wake exactly once
+
+    def info(self):
+        return {
+            'id': self.doc_id, 'name': os.path.basename(self.pdf_path),
+            'word_count': len(self.words), 'page_count': len(self.page_word_indices),
+            'page_word_indices': list(self.page_word_indices),
+            'complete': self.complete, 'error': self.error, 'warnings': list(self.warnings),
+        }
+
+    def page_bounds(self, page_index):
+        """(start, end) word indices of a 0-indexed page that has been extracted."""
+        start = self.page_word_indices[page_index]
+        if page_index + 1 < len(self.page_word_indices): return start, self.page_word_indices[page_index + 1]
+        return start, len(self.words)
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def _add_page(self, page_words):
+        self.page_word_indices.append(len(self.words))
+        self.words.extend(page_words)
+        self._notify()
+
+    def _add_warning(self, message):
+        self.warnings.append(message)
+
+    def _finish(self, error=None):
+        self.complete = True
+        self.error = error
+        self._notify()
+
+    def wait_for_change(self):
+        """
+        Returns an awaitable that completes on the next change after this call. The
+        current event is captured here, not when the awaitable first runs, so a page
+        added in between still wakes the waiter.
+        """
+        if self.complete: return asyncio.sleep(0)
+        return self._changed.wait()
+
+    async def wait_for_words(self, end_idx):
+        while len(self.words) < end_idx and not self.complete:
+            await self.wait_for_change()
+
+
+class DocumentNotFound(Exception):
+    """Raised for PDFs that are missing or outside the store's root directory."""
+
+
+class DocumentStore:
+    """In-memory LRU cache of SharedDocuments for PDFs under a single root directory."""
+    def __init__(self, root_dir, max_documents=MAX_CACHED_DOCUMENTS):
+        self.root_dir = os.path.realpath(root_dir)
+        self.max_documents = max(1, max_documents)
+        self._documents = OrderedDict()
+
+    @staticmethod
+    def _doc_id_for(pdf_path):
+        return hashlib.sha1(pdf_path.encode('utf-8')).hexdigest()[:16]
+
+    def get(self, doc_id):
+        document = self._documents.get(doc_id)
+        if document: self._documents.move_to_end(doc_id)
+        return document
+
+    def resolve(self, pdf_path):
+        """Absolute real path of a PDF given relative to (or inside) the root directory."""
+        resolved = os.path.realpath(os.path.join(self.root_dir, pdf_path))
+        try: inside_root = os.path.commonpath([self.root_dir, resolved]) == self.root_dir
+        except ValueError: inside_root = False # Different drives on Windows
+        if not inside_root: raise DocumentNotFound(pdf_path)
+        if not resolved.lower().endswith('.pdf') or not os.path.isfile(resolved): raise DocumentNotFound(pdf_path)
+        return resolved
+
+    def open(self, pdf_path):
+        """Returns the shared document for a PDF, starting its extraction if it isn't cached."""
+        pdf_path = self.resolve(pdf_path)
+        try: mtime = os.path.getmtime(pdf_path)
+        except OSError: raise DocumentNotFound(pdf_path)
+        doc_id = self._doc_id_for(pdf_path)
+        document = self.get(doc_id)
+        if document and document.mtime == mtime and not document.error: return document
+        document = SharedDocument(doc_id, pdf_path, mtime)
+        self._documents[doc_id] = document
+        self._documents.move_to_end(doc_id)
+        while len(self._documents) > self.max_documents:
+            self._documents.popitem(last=False) # Sessions already streaming it keep their reference
+        loop = asyncio.get_running_loop()
+        loop.run_in_executor(None, self._extract, document, loop)
+        return document
+
+    @staticmethod
+    def _extract(document, loop):
+        """Runs in a worker thread; hands each page to the event loop as soon as it is extracted."""
+        warn = lambda message: loop.call_soon_threadsafe(document._add_warning, message)
+        try:
+            for page_words in iter_pdf_page_words(document.pdf_path, warn=warn):
+                loop.call_soon_threadsafe(document._add_page, page_words)
+        except Exception as e:
+            print(f"Error extracting text from {document.pdf_path}: {e}")
+            loop.call_soon_threadsafe(document._finish, "Text extraction failed.")
+            return
+        loop.call_soon_threadsafe(document._finish)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class WebSocketFrameTooLarge(Exception):
+    """Raised for incoming WebSocket frames longer than the reader allows."""
+
+
+class RSVPStreamServer:
+    """
+    Headless asyncio HTTP/WebSocket service exposing the reader's PDF text
+    extraction to browser clients. Only PDFs under root_dir can be opened, and
+    browser requests are only accepted from allowed_origins.
+
+    GET /documents?path=<pdf>      open a PDF relative to root_dir (extraction starts in the background)
+    GET /documents/<id>            document info and page offsets extracted so far
+    GET /documents/<id>/words      word range via ?start=&end= or a "Range: words=a-b" header
+    GET /documents/<id>/stream     WebSocket streaming words and page offsets as pages are extracted
+    """
+    def __init__(self, root_dir, host=SERVER_DEFAULT_HOST, port=SERVER_DEFAULT_PORT,
+                 allowed_origins=SERVER_DEFAULT_ALLOWED_ORIGINS):
+        self.host = host
+        self.port = port
+        self.allowed_origins = frozenset(allowed_origins)
+        self.store = DocumentStore(root_dir)
+
+    async def serve_forever(self):
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        print(f"RSVP stream server listening on http://{self.host}:{self.port}, serving {self.store.root_dir}")
+        async with server: await server.serve_forever()
+
+    # --- HTTP ---
+    async def _handle_connection(self, reader, writer):
+        headers = {}
+        try:
+            method, target, headers = await self._read_request(reader)
+            if not self._is_allowed_host(headers.get('host'), writer.get_extra_info('sockname')[1]):
+                raise HTTPError(HTTPStatus.FORBIDDEN, "Host not allowed.") # Blocks DNS rebinding
+            origin = headers.get('origin')
+            if origin is not None and origin not in self.allowed_origins: # Also guards WebSocket upgrades
+                raise HTTPError(HTTPStatus.FORBIDDEN, "Origin not allowed.")
+            if method == 'OPTIONS':
+                await self._send_response(writer, HTTPStatus.NO_CONTENT, b'', headers)
+            elif method != 'GET':
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Only GET is supported.")
+            else:
+                await self._route(reader, writer, target, headers)
+        except HTTPError as e:
+            await self._send_json(writer, e.status, {'error': str(e)}, headers)
+        except (asyncio.IncompleteReadError, ConnectionError): pass
+        except Exception as e:
+            print(f"Error handling request: {e}")
+            try: await self._send_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "Internal server error."}, headers)
+            except ConnectionError: pass
+        finally:
+            writer.close()
+            try: await writer.wait_closed()
+            except ConnectionError: pass
+
+    def _is_allowed_host(self, host_header, port):
+        """Same-origin requests carry no Origin, so the Host must name this server, not a rebound domain."""
+        if not host_header: return False
+        bound_host = f"[{self.host}]" if ':' in self.host else self.host # IPv6 literals are bracketed in Host
+        return host_header.lower() in {f"{name}:{port}" for name in (bound_host.lower(),) + SERVER_LOCAL_HOST_NAMES}
+
+    @staticmethod
+    async def _read_request(reader):
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        parts = request_line.split()
+        if len(parts) != 3: raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line.")
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1')
+            if line in ('\r\n', '\n', ''): break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return parts[0].upper(), parts[1], headers
+
+    async def _route(self, reader, writer, target, headers):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        segments = [segment for segment in url.path.split('/') if segment]
+        if segments == ['documents']:
+            pdf_path = query.get('path', [None])[0]
+            if not pdf_path: raise HTTPError(HTTPStatus.BAD_REQUEST, "Missing 'path' query parameter.")
+            try: document = self.store.open(pdf_path)
+            except DocumentNotFound: raise HTTPError(HTTPStatus.NOT_FOUND, "Document not found.")
+            await self._send_json(writer, HTTPStatus.OK, document.info(), headers)
+            return
+        if len(segments) < 2 or segments[0] != 'documents':
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Unknown endpoint.")
+        document = self.store.get(segments[1])
+        if document is None: raise HTTPError(HTTPStatus.NOT_FOUND, "Unknown document.")
+        if len(segments) == 2:
+            await self._send_json(writer, HTTPStatus.OK, document.info(), headers)
+        elif segments[2:] == ['words']:
+            await self._send_word_range(writer, document, query, headers)
+        elif segments[2:] == ['stream']:
+            await self._stream_document(reader, writer, document, headers)
+        else:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Unknown endpoint.")
+
+    @staticmethod
+    def _parse_word_range(query, headers):
+        """
+        Returns (start, end, is_range_header) with end exclusive, or None when the client
+        left it open ("words=a-" or no ?end=). Suffix ranges ("words=-b") aren't supported
+        since the total is unknown while extracting; they and other bad ranges raise HTTPError.
+        """
+        try:
+            range_header = headers.get('range')
+            if range_header:
+                unit, _, spec = range_header.partition('=')
+                if unit.strip() != 'words': raise ValueError
+                first, _, last = spec.partition('-') # Inclusive, like byte ranges
+                start = int(first)
+                return start, (int(last) + 1 if last.strip() else None), True
+            start = int(query.get('start', ['0'])[0])
+            end = query.get('end', [None])[0]
+            return start, (int(end) if end is not None else None), False
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid word range.")
+
+    async def _send_word_range(self, writer, document, query, headers):
+        start, end, is_range_header = self._parse_word_range(query, headers)
+        if start < 0 or (end is not None and end <= start): raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid word range.")
+        if end is None: # Open-ended: return what is extracted so far, only waiting for the first word
+            end = start + MAX_RANGE_WORDS
+            await document.wait_for_words(start + 1)
+        else: # Explicit: wait until the whole range has been extracted
+            end = min(end, start + MAX_RANGE_WORDS)
+            await document.wait_for_words(end)
+        end = min(end, len(document.words))
+        if start >= end: raise HTTPError(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, "Range is beyond the document text.")
+        payload = {
+            'start': start, 'end': end, 'words': document.words[start:end],
+            'page': bisect_right(document.page_word_indices, start), # 1-indexed page of the first word
+            'word_count': len(document.words), 'complete': document.complete,
+        }
+        if is_range_header:
+            total = len(document.words) if document.complete else '*'
+            await self._send_json(writer, HTTPStatus.PARTIAL_CONTENT, payload, headers,
+                                  {'Content-Range': f"words {start}-{end - 1}/{total}"})
+        else:
+            await self._send_json(writer, HTTPStatus.OK, payload, headers)
+
+    async def _send_response(self, writer, status, body, request_headers=None, extra_headers=None,
+                             content_type='application/json'):
+        headers = {'Content-Type': content_type, 'Content-Length': str(len(body)), 'Connection': 'close'}
+        origin = (request_headers or {}).get('origin')
+        if origin in self.allowed_origins:
+            headers.update({
+                'Access-Control-Allow-Origin': origin, 'Vary': 'Origin',
+                'Access-Control-Allow-Headers': 'Range', 'Access-Control-Expose-Headers': 'Content-Range',
+            })
+        if extra_headers: headers.update(extra_headers)
+        head = f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        head += ''.join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def _send_json(self, writer, status, payload, request_headers=None, extra_headers=None):
+        await self._send_response(writer, status, json.dumps(payload).encode('utf-8'), request_headers, extra_headers)
+
+    # --- WebSocket ---
+    @staticmethod
+    def _encode_ws_frame(payload, opcode=0x1):
+        header = bytearray([0x80 | opcode]) # FIN + opcode; server frames are never masked
+        if len(payload) < 126: header.append(len(payload))
+        elif len(payload) < 65536: header += bytes([126]) + struct.pack('!H', len(payload))
+        else: header += bytes([127]) + struct.pack('!Q', len(payload))
+        return bytes(header) + payload
+
+    @staticmethod
+    async def _read_ws_frame(reader, max_length=None):
+        first, second = await reader.readexactly(2)
+        opcode = first & 0x0F
+        length = second & 0x7F
+        if length == 126: length = struct.unpack('!H', await reader.readexactly(2))[0]
+        elif length == 127: length = struct.unpack('!Q', await reader.readexactly(8))[0]
+        if max_length is not None and length > max_length: raise WebSocketFrameTooLarge(length)
+        mask = await reader.readexactly(4) if second & 0x80 else None
+        payload = await reader.readexactly(length)
+        if mask: payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return opcode, payload
+
+    async def _watch_ws_client(self, reader, writer):
+        """Answers pings and returns once the client closes the connection or sends an oversized frame."""
+        try:
+            while True:
+                opcode, payload = await self._read_ws_frame(reader, MAX_CLIENT_FRAME_BYTES)
+                if opcode == 0x8:
+                    writer.write(self._encode_ws_frame(payload[:2], opcode=0x8)); return
+                if opcode == 0x9: writer.write(self._encode_ws_frame(payload, opcode=0xA))
+        except WebSocketFrameTooLarge:
+            writer.write(self._encode_ws_frame(struct.pack('!H', 1009), opcode=0x8)) # Message too big
+        except (asyncio.IncompleteReadError, ConnectionError): return
+
+    async def _send_ws_json(self, writer, payload):
+        writer.write(self._encode_ws_frame(json.dumps(payload).encode('utf-8')))
+        await writer.drain()
+
+    async def _stream_document(self, reader, writer, document, headers):
+        key = headers.get('sec-websocket-key')
+        if headers.get('upgrade', '').lower() != 'websocket' or not key:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Expected a WebSocket upgrade.")
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode('latin-1')).digest()).decode('ascii')
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode('latin-1'))
+        await writer.drain()
+
+        client_closed = asyncio.create_task(self._watch_ws_client(reader, writer))
+        try:
+            page_index = 0
+            while not client_closed.done():
+                while page_index < len(document.page_word_indices):
+                    page_start, page_end = document.page_bounds(page_index)
+                    for start in range(page_start, max(page_end, page_start + 1), STREAM_WORDS_PER_MESSAGE):
+                        end = min(page_end, start + STREAM_WORDS_PER_MESSAGE)
+                        await self._send_ws_json(writer, {
+                            'type': 'words', 'page': page_index + 1, 'page_offset': page_start,
+                            'start': start, 'words': document.words[start:end],
+                        })
+                    page_index += 1
+                if document.complete:
+                    await self._send_ws_json(writer, {'type': 'done', **document.info()})
+                    break
+                changed = asyncio.ensure_future(document.wait_for_change())
+                await asyncio.wait({changed, client_closed}, return_when=asyncio.FIRST_COMPLETED)
+                changed.cancel()
+            close_code = 1000 # Normal closure
+        except (asyncio.IncompleteReadError, ConnectionError): return
+        except Exception as e: # Past the 101 response an HTTP error reply would corrupt the stream
+            print(f"Error streaming document {document.doc_id}: {e}")
+            close_code = 1011 # Internal error
+        finally:
+            client_gone = client_closed.done() # The watcher already answered the client's close frame
+            client_closed.cancel()
+        if not client_gone:
+            try:
+                writer.write(self._encode_ws_frame(struct.pack('!H', close_code), opcode=0x8))
+                await writer.drain()
+            except ConnectionError: pass
+
+
+def run_stream_server(root_dir, host=SERVER_DEFAULT_HOST, port=SERVER_DEFAULT_PORT,
+                      allowed_origins=SERVER_DEFAULT_ALLOWED_ORIGINS):
+    try: asyncio.run(RSVPStreamServer(root_dir, host, port, allowed_origins).serve_forever())
+    except KeyboardInterrupt: pass
+
+
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = RSVPApp(root)
-    root.protocol("WM_DELETE_WINDOW", app.on_closing)
-    root.mainloop()
+    parser = argparse.ArgumentParser(description="Advanced RSVP PDF Reader")
+    parser.add_argument('--serve', action='store_true', help="Run the headless HTTP/WebSocket server instead of the UI")
+    parser.add_argument('--host', default=SERVER_DEFAULT_HOST, help=f"Server host (default {SERVER_DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=SERVER_DEFAULT_PORT, help=f"Server port (default {SERVER_DEFAULT_PORT})")
+    parser.add_argument('--root', help="Directory of PDFs the server may open (required with --serve)")
+    parser.add_argument('--allow-origin', action='append', dest='allowed_origins', metavar='ORIGIN',
+                        help=f"Browser origin allowed to use the server; repeatable (default {', '.join(SERVER_DEFAULT_ALLOWED_ORIGINS)})")
+    args = parser.parse_args()
+    if args.serve:
+        if not args.root or not os.path.isdir(args.root): parser.error("--serve requires --root pointing to an existing directory")
+        run_stream_server(args.root, args.host, args.port, args.allowed_origins or SERVER_DEFAULT_ALLOWED_ORIGINS)
+    else:
+        root = tk.Tk()
+        app = RSVPApp(root)
+        root.protocol("WM_DELETE_WINDOW", app.on_closing)
+        root.mainloop()
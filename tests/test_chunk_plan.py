@@ -0,0 +1,60 @@
+import pytest
+
+for module_name in ("PyPDF2", "fitz", "PIL"): pytest.importorskip(module_name)
+
+from RSVPREADER9 import ChunkPlan, ends_sentence
+
+WORDS = "I went to the store and bought some milk. We are in the house now.".split()
+
+
+def chunk_texts(plan, words):
+    return [" ".join(words[start:end]) for start, end in (plan.chunk_bounds(i) for i in range(plan.chunk_count))]
+
+
+@pytest.mark.parametrize("chunk_size, expected", [
+    (1, WORDS),
+    (2, ['I went', 'to the', 'store', 'and bought', 'some milk.', 'We are', 'in the', 'house now.']),
+    (3, ['I went', 'to the store', 'and bought some', 'milk.', 'We are', 'in the house', 'now.']),
+    (4, ['I went', 'to the store', 'and bought some milk.', 'We are', 'in the house now.']),
+    (5, ['I went to the store', 'and bought some milk.', 'We are in the house', 'now.']),
+])
+def test_chunk_boundaries(chunk_size, expected):
+    assert chunk_texts(ChunkPlan(WORDS, chunk_size), WORDS) == expected
+
+
+def test_trailing_function_words_move_to_the_next_chunk():
+    words = "read a book about the sea".split()
+    assert chunk_texts(ChunkPlan(words, 4), words) == ['read a book', 'about the sea']
+
+
+def test_chunks_never_cross_hard_breaks():
+    plan = ChunkPlan(WORDS, 5, hard_breaks=[3])
+    assert 3 in plan.chunk_starts
+    assert chunk_texts(plan, WORDS)[0] == "I went to"
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 6))
+def test_forward_and_backward_steps_are_symmetric(chunk_size):
+    plan = ChunkPlan(WORDS, chunk_size, hard_breaks=[7])
+    forward = [0]
+    while plan.next_start(forward[-1]) < len(WORDS): forward.append(plan.next_start(forward[-1]))
+    backward = [forward[-1]]
+    while backward[-1] > 0: backward.append(plan.previous_start(backward[-1]))
+    assert forward == backward[::-1]
+    assert forward == list(plan.chunk_starts[:-1])
+
+
+def test_lookups_mid_chunk_and_past_end():
+    plan = ChunkPlan(WORDS, 3)
+    assert plan.chunk_start_for(3) == 2
+    assert plan.previous_start(3) == 2 # Mid-chunk steps back to the start of the current chunk
+    assert plan.next_start(len(WORDS)) == len(WORDS)
+    assert plan.progress(len(WORDS) - 1) == 100
+
+
+@pytest.mark.parametrize("word, expected", [
+    ("milk.", True), ("no.", True), ("end.)", True), ('"Stop!"', True), ("why?”", True),
+    ("milk", False), ("(aside)", False),
+])
+def test_ends_sentence_ignores_closing_punctuation(word, expected):
+    assert ends_sentence(word) is expected
@@ -0,0 +1,266 @@
+import asyncio
+import json
+import os
+import struct
+
+import pytest
+
+for module_name in ("PyPDF2", "fitz", "PIL"): pytest.importorskip(module_name)
+
+from RSVPREADER9 import (DocumentNotFound, DocumentStore, HTTPError, RSVPStreamServer, SharedDocument,
+                         WebSocketFrameTooLarge)
+
+
+def make_server(root_dir):
+    return RSVPStreamServer(str(root_dir), allowed_origins=("http://localhost:5173",))
+
+
+async def start_test_server(server):
+    tcp_server = await asyncio.start_server(server._handle_connection, "127.0.0.1", 0)
+    return tcp_server, tcp_server.sockets[0].getsockname()[1]
+
+
+def add_document(server, doc_id="doc"):
+    document = SharedDocument(doc_id, os.path.join(server.store.root_dir, "doc.pdf"), 0)
+    server.store._documents[doc_id] = document
+    return document
+
+
+async def http_get(port, target, headers=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    headers = {"Host": f"127.0.0.1:{port}", **(headers or {})}
+    lines = [f"GET {target} HTTP/1.1"] + [f"{k}: {v}" for k, v in headers.items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    response_headers = {k.lower(): v.strip() for k, _, v in (line.partition(":") for line in header_lines)}
+    return int(status_line.split()[1]), response_headers, json.loads(body) if body else None
+
+
+async def open_stream(port, doc_id):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write((f"GET /documents/{doc_id}/stream HTTP/1.1\r\nHost: localhost:{port}\r\nUpgrade: websocket\r\n"
+                  "Connection: Upgrade\r\nSec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"
+                  "Origin: http://localhost:5173\r\n\r\n").encode("latin-1"))
+    status_line = (await reader.readuntil(b"\r\n\r\n")).split(b"\r\n")[0]
+    assert status_line == b"HTTP/1.1 101 Switching Protocols"
+    return reader, writer
+
+
+async def read_stream_messages(reader):
+    messages = []
+    while True:
+        opcode, payload = await RSVPStreamServer._read_ws_frame(reader)
+        if opcode == 0x8: return messages, struct.unpack("!H", payload)[0]
+        messages.append(json.loads(payload))
+
+
+# --- Range parsing ---
+@pytest.mark.parametrize("query, headers, expected", [
+    ({}, {"range": "words=10-19"}, (10, 20, True)),
+    ({}, {"range": "words=10-"}, (10, None, True)),
+    ({"start": ["5"], "end": ["9"]}, {}, (5, 9, False)),
+    ({"start": ["5"]}, {}, (5, None, False)),
+    ({}, {}, (0, None, False)),
+])
+def test_parse_word_range(query, headers, expected):
+    assert RSVPStreamServer._parse_word_range(query, headers) == expected
+
+
+@pytest.mark.parametrize("query, headers", [
+    ({}, {"range": "words=-5"}),
+    ({}, {"range": "bytes=0-9"}),
+    ({}, {"range": "words=a-b"}),
+    ({"start": ["x"]}, {}),
+])
+def test_parse_word_range_rejects_invalid_ranges(query, headers):
+    with pytest.raises(HTTPError) as excinfo: RSVPStreamServer._parse_word_range(query, headers)
+    assert excinfo.value.status == 400
+
+
+# --- WebSocket framing ---
+def read_frame(data, max_length=None):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await RSVPStreamServer._read_ws_frame(reader, max_length)
+    return asyncio.run(read())
+
+
+@pytest.mark.parametrize("length", [0, 125, 126, 65535, 65536])
+def test_ws_frame_round_trip(length):
+    payload = bytes(i % 251 for i in range(length))
+    assert read_frame(RSVPStreamServer._encode_ws_frame(payload)) == (0x1, payload)
+    assert read_frame(RSVPStreamServer._encode_ws_frame(payload, opcode=0x8)) == (0x8, payload)
+
+
+@pytest.mark.parametrize("length", [125, 126, 65536])
+def test_read_masked_client_frame(length):
+    payload = bytes(i % 251 for i in range(length))
+    mask = b"\x01\x02\x03\x04"
+    unmasked = RSVPStreamServer._encode_ws_frame(payload)
+    header_length = len(unmasked) - length
+    header = bytearray(unmasked[:header_length])
+    header[1] |= 0x80
+    masked_payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    assert read_frame(bytes(header) + mask + masked_payload) == (0x1, payload)
+
+
+def test_read_frame_rejects_lengths_over_the_limit():
+    assert read_frame(RSVPStreamServer._encode_ws_frame(bytes(125)), max_length=125) == (0x1, bytes(125))
+    # Only the header is needed: the length is checked before any payload is read
+    for header in (bytes([0x81, 126]) + struct.pack("!H", 126), bytes([0x81, 127]) + struct.pack("!Q", 2 ** 62)):
+        with pytest.raises(WebSocketFrameTooLarge): read_frame(header, max_length=125)
+
+
+# --- Document store ---
+def test_store_only_opens_pdfs_under_root(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "inside.pdf").write_bytes(b"")
+    (root / "notes.txt").write_text("secret")
+    (tmp_path / "outside.pdf").write_bytes(b"")
+    store = DocumentStore(str(root))
+    assert store.resolve("inside.pdf") == os.path.realpath(root / "inside.pdf")
+    assert store.resolve(str(root / "inside.pdf")) == os.path.realpath(root / "inside.pdf")
+    for path in ("../outside.pdf", str(tmp_path / "outside.pdf"), "notes.txt", "missing.pdf", "/etc/passwd"):
+        with pytest.raises(DocumentNotFound): store.resolve(path)
+
+
+def test_store_treats_paths_on_other_drives_as_not_found(tmp_path, monkeypatch):
+    store = DocumentStore(str(tmp_path))
+    def commonpath_across_drives(paths): raise ValueError("Paths don't have the same drive")
+    monkeypatch.setattr(os.path, "commonpath", commonpath_across_drives)
+    with pytest.raises(DocumentNotFound): store.resolve("D:\\x.pdf")
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    for name in ("a", "b", "c"): (tmp_path / f"{name}.pdf").write_bytes(b"")
+
+    async def run():
+        store = DocumentStore(str(tmp_path), max_documents=2)
+        a = store.open("a.pdf")
+        b = store.open("b.pdf")
+        assert store.get(a.doc_id) is a # Marks "a" as recently used
+        store.open("c.pdf")
+        return store, a, b
+
+    store, a, b = asyncio.run(run())
+    assert store.get(a.doc_id) is a
+    assert store.get(b.doc_id) is None
+
+
+# --- Server ---
+def test_concurrent_clients_share_document_while_pages_arrive(tmp_path):
+    async def run():
+        server = make_server(tmp_path)
+        document = add_document(server)
+        tcp_server, port = await start_test_server(server)
+        loop = asyncio.get_running_loop()
+        async with tcp_server:
+            document._add_page(["first", "page"])
+            clients = [await open_stream(port, "doc") for _ in range(2)]
+            readers = [asyncio.ensure_future(read_stream_messages(reader)) for reader, _ in clients]
+            await asyncio.sleep(0.05)
+            # Pages arrive from a worker thread, the same way the extraction hands them over
+            def extract():
+                loop.call_soon_threadsafe(document._add_page, [])
+                loop.call_soon_threadsafe(document._add_page, [f"w{i}" for i in range(700)])
+                loop.call_soon_threadsafe(document._finish)
+            await loop.run_in_executor(None, extract)
+            results = await asyncio.wait_for(asyncio.gather(*readers), timeout=5)
+            for _, writer in clients: writer.close()
+        return document, results
+
+    document, results = asyncio.run(run())
+    (first_messages, first_code), (second_messages, second_code) = results
+    assert first_messages == second_messages
+    assert first_code == second_code == 1000
+    words = [m for m in first_messages if m["type"] == "words"]
+    assert [(m["page"], m["page_offset"], m["start"], len(m["words"])) for m in words] == [
+        (1, 0, 0, 2), (2, 2, 2, 0), (3, 2, 2, 500), (3, 2, 502, 200)]
+    assert sum((m["words"] for m in words), []) == document.words
+    assert first_messages[-1]["type"] == "done"
+    assert first_messages[-1]["page_word_indices"] == [0, 2, 2]
+
+
+def test_oversized_client_frame_closes_stream_with_1009(tmp_path):
+    async def run():
+        server = make_server(tmp_path)
+        add_document(server)
+        tcp_server, port = await start_test_server(server)
+        async with tcp_server:
+            reader, writer = await open_stream(port, "doc")
+            writer.write(bytes([0x81, 0xFF]) + struct.pack("!Q", 2 ** 40) + b"mask") # Claims a 1 TiB payload
+            result = await asyncio.wait_for(read_stream_messages(reader), timeout=5)
+            writer.close()
+        return result
+
+    messages, close_code = asyncio.run(run())
+    assert messages == []
+    assert close_code == 1009
+
+
+def test_open_ended_range_returns_extracted_words_without_waiting(tmp_path):
+    async def run():
+        server = make_server(tmp_path)
+        document = add_document(server)
+        document._add_page(["a", "b", "c"])
+        tcp_server, port = await start_test_server(server)
+        async with tcp_server:
+            open_ended = await asyncio.wait_for(http_get(port, "/documents/doc/words?start=1"), timeout=5)
+            header_range = await asyncio.wait_for(
+                http_get(port, "/documents/doc/words", {"Range": "words=0-"}), timeout=5)
+            explicit = asyncio.ensure_future(http_get(port, "/documents/doc/words?start=0&end=5"))
+            await asyncio.sleep(0.05)
+            assert not explicit.done() # Explicit ranges wait for the rest of the words
+            document._add_page(["d", "e"])
+            return open_ended, header_range, await asyncio.wait_for(explicit, timeout=5)
+
+    open_ended, header_range, explicit = asyncio.run(run())
+    assert open_ended[0] == 200 and open_ended[2]["words"] == ["b", "c"]
+    assert header_range[0] == 206 and header_range[1]["content-range"] == "words 0-2/*"
+    assert explicit[2]["words"] == ["a", "b", "c", "d", "e"]
+
+
+def test_disallowed_origins_are_rejected(tmp_path):
+    async def run():
+        server = make_server(tmp_path)
+        add_document(server)
+        tcp_server, port = await start_test_server(server)
+        async with tcp_server:
+            allowed = await http_get(port, "/documents/doc", {"Origin": "http://localhost:5173"})
+            rejected = await http_get(port, "/documents/doc", {"Origin": "https://evil.example"})
+            rejected_stream = await http_get(port, "/documents/doc/stream", {
+                "Origin": "https://evil.example", "Upgrade": "websocket", "Connection": "Upgrade",
+                "Sec-WebSocket-Key": "dGhlIHNhbXBsZSBub25jZQ=="})
+            missing = await http_get(port, "/documents?path=../secret.pdf")
+        return allowed, rejected, rejected_stream, missing
+
+    allowed, rejected, rejected_stream, missing = asyncio.run(run())
+    assert allowed[0] == 200 and allowed[1]["access-control-allow-origin"] == "http://localhost:5173"
+    assert rejected[0] == rejected_stream[0] == 403
+    assert "access-control-allow-origin" not in rejected[1]
+    assert missing[0] == 404 and missing[2] == {"error": "Document not found."}
+
+
+def test_rebound_hosts_are_rejected(tmp_path):
+    async def run():
+        server = make_server(tmp_path)
+        add_document(server)
+        tcp_server, port = await start_test_server(server)
+        async with tcp_server:
+            local = [await http_get(port, "/documents/doc", {"Host": f"{name}:{port}"})
+                     for name in ("localhost", "127.0.0.1", "LOCALHOST")]
+            rebound = await http_get(port, "/documents/doc", {"Host": f"evil.example:{port}"})
+            wrong_port = await http_get(port, "/documents/doc", {"Host": f"localhost:{port + 1}"})
+            no_port = await http_get(port, "/documents/doc", {"Host": "localhost"})
+        return local, rebound, wrong_port, no_port
+
+    local, rebound, wrong_port, no_port = asyncio.run(run())
+    assert [response[0] for response in local] == [200, 200, 200]
+    assert rebound[0] == wrong_port[0] == no_port[0] == 403
+    assert rebound[2] == {"error": "Host not allowed."}